@@ -4,6 +4,7 @@ import logger_factory
 import urllib.parse
 import argparse
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
 COMMAND_FORMAT = 'gallery-dl -D "{path}" \
@@ -14,6 +15,11 @@ ORDER_BY = ("date", "date_d", "popular_d")
 
 S_MODE = ("s_tag", "s_tag_full", "s_tc")
 
+# Concurrent gallery-dl processes. Downloads are I/O-bound against
+# Pixiv, but keep this low so the shared archive sqlite and
+# rate limit are not contended
+MAX_DOWNLOAD_WORKERS = 4
+
 logger_handlers = [
     logger_factory.get_file_handler(log_prefix=os.path.basename(__file__)),
     logger_factory.get_default_stream_handler()
@@ -47,6 +53,9 @@ def batch_download_pixiv_by_tags(
     # Count row to skip rows
     rows_count = 0
 
+    # Collect all commands first, then dispatch them to a thread pool
+    cmds = []
+
     for obj in tags_list:
         # If rows count less than skip rows, skip current iteration
         if rows_count < skip_rows:
@@ -69,20 +78,34 @@ def batch_download_pixiv_by_tags(
 
         while scd.year >= temp.year:
 
-            logger.info(f"download {tag_name}, scd: {scd.date()}, ecd: {ecd.date()}")
+            logger.info(f"queue download {tag_name}, scd: {scd.date()}, ecd: {ecd.date()}")
 
             cmd = COMMAND_FORMAT.format(path=path, range=range_string, tag=urllib.parse.quote(tag_name), order=order, scd=scd.date(), ecd=ecd.date(), s_mode=s_mode)
 
-            logger.debug(f"Execute {cmd}")
-
-            result = subprocess.run(cmd, capture_output=False, shell=True)
-
-            if(result.returncode != 0):
-                logger.warning(f"error occured executing {cmd}, stderr: {result.stderr}")
+            cmds.append(cmd)
 
             ecd = ecd.replace(year=ecd.year - 1)
             scd = scd.replace(year=scd.year - 1)
 
+    logger.info(f"Execute {len(cmds)} downloads with {MAX_DOWNLOAD_WORKERS} workers...")
+
+    # gallery-dl is I/O-bound, so run several processes concurrently.
+    # Threads are enough here since subprocess.run releases the GIL
+    with ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS) as executor:
+        futures = {
+            executor.submit(subprocess.run, cmd, capture_output=False, shell=True): cmd
+            for cmd in cmds
+        }
+
+        for future in as_completed(futures):
+            cmd = futures[future]
+            try:
+                result = future.result()
+                if(result.returncode != 0):
+                    logger.warning(f"error occured executing {cmd}, stderr: {result.stderr}")
+            except Exception as e:
+                logger.warning(f"error occured executing {cmd} - {e}")
+
 if __name__ == '__main__':
 
     parser = argparse.ArgumentParser(
@@ -1,56 +1,108 @@
-import json
+import orjson
 import sqlite3
-import requests
+import httpx
+import asyncio
 import argparse
-import time
 import os
 import logger_factory
 
 MAX_RETRIES = 3
 RETRY_DELAY = 5
 
+# Concurrent in-flight requests to Danbooru API
+MAX_CONCURRENCY = 8
+
+# Minimum spacing between request starts (Danbooru allows about
+# 10 requests per second per account)
+MIN_REQUEST_INTERVAL = 0.1
+
+API_URL = "https://danbooru.donmai.us/wiki_pages.json"
+
 logger_handlers = [
     logger_factory.get_file_handler(log_prefix=os.path.basename(__file__)),
     logger_factory.get_default_stream_handler()
 ]
 logger = logger_factory.get_custom_handlers_logger(__file__, logger_handlers)
 
-def fetch_other_names(tag_name: str, username: str, api_key: str):
+# shared pacing state for _wait_request_turn
+_pace_lock = asyncio.Lock()
+_next_request_time = 0.0
+
+async def _wait_request_turn():
+    """
+    Space request starts at least MIN_REQUEST_INTERVAL apart.
+
+    The semaphore only bounds how many requests are in flight; this
+    adds the actual rate limit so bursts don't hit the API throttle
+    """
+    global _next_request_time
+
+    async with _pace_lock:
+        loop_time = asyncio.get_running_loop().time()
+        delay = _next_request_time - loop_time
+        _next_request_time = max(_next_request_time, loop_time) + MIN_REQUEST_INTERVAL
+
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+async def fetch_other_names(tag_name: str, username: str, api_key: str,
+                            client: httpx.AsyncClient, sem: asyncio.Semaphore):
     """
     fetch aliases from Danbooru API
     """
-    url = f"https://danbooru.donmai.us/wiki_pages.json?search[title]={tag_name}&login={username}&api_key={api_key}"
+    params = {"search[title]": tag_name, "login": username, "api_key": api_key}
 
     # Repeat until attempt reach MAX_RETRIES
     for attempt in range(1, MAX_RETRIES + 1):
         try:
-            # send request and raise HTTPError if has occurred
-            response = requests.get(url, timeout=15)
-            response.raise_for_status()
+            # Semaphore bounds in-flight requests; the pacing call
+            # below enforces the per-second rate limit
+            async with sem:
+                await _wait_request_turn()
 
-            # get response body by json
-            data = response.json()
+                # send request and raise HTTPError if has occurred
+                response = await client.get(API_URL, params=params)
+                response.raise_for_status()
+
+            # get response body by json (orjson parses bytes directly)
+            data = orjson.loads(response.content)
             if data and isinstance(data, list):
                 # join to one string
                 return ",".join(data[0].get("other_names", []))
-            break 
+            break
         except Exception as e:
             logger.warning(f"[WARN] Attempt {attempt} failed for '{tag_name}': {e}")
             if attempt < MAX_RETRIES:
                 logger.info(f"[INFO] Retrying in {RETRY_DELAY} seconds...")
-                time.sleep(RETRY_DELAY)
+                await asyncio.sleep(RETRY_DELAY)
             else:
                 logger.error(f"[ERROR] All retries failed for '{tag_name}'")
 
     return "(none)"
 
+async def fetch_all_other_names(tag_names: list, username: str, api_key: str):
+    """
+    Fetch aliases for all tags concurrently.
+
+    One pooled HTTP/2 connection is reused for every request instead of
+    a fresh TCP/TLS handshake per tag.
+    """
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    limits = httpx.Limits(max_connections=MAX_CONCURRENCY)
+
+    async with httpx.AsyncClient(http2=True, timeout=15, limits=limits) as client:
+        return await asyncio.gather(*(
+            fetch_other_names(tag_name, username, api_key, client, sem)
+            for tag_name in tag_names
+        ))
+
 def main(tag_file_path, output_db_path, username: str, api_key: str):
     if not os.path.exists(tag_file_path):
         logger.error(f"[ERROR] Tag file not found: {tag_file_path}")
         return
 
-    with open(tag_file_path, "r", encoding="utf-8") as f:
-        tags_data = json.load(f)
+    with open(tag_file_path, "rb") as f:
+        tags_data = orjson.loads(f.read())
 
     conn = sqlite3.connect(output_db_path)
     cursor = conn.cursor()
@@ -65,22 +117,28 @@ def main(tag_file_path, output_db_path, username: str, api_key: str):
     )
     """)
 
-    cursor.execute("BEGIN TRANSACTION;")
+    tag_names = [tag.get("name") for tag in tags_data]
+
+    logger.info(f"[INFO] Fetching aliases for {len(tag_names)} tags...")
 
-    for tag in tags_data:
-        name = tag.get("name")
-        post_count = tag.get("post_count", 0)
-        created_at = tag.get("created_at")
+    # Fetch all aliases concurrently before touching the database
+    other_names_list = asyncio.run(fetch_all_other_names(tag_names, username, api_key))
 
-        other_names = fetch_other_names(name, username, api_key)
+    # Collect rows and insert with one executemany so the statement is
+    # prepared once instead of per-row execute round trips
+    rows = [
+        (tag.get("name"), tag.get("post_count", 0), tag.get("created_at"), other_names)
+        for tag, other_names in zip(tags_data, other_names_list)
+    ]
+
+    cursor.execute("BEGIN TRANSACTION;")
 
-        cursor.execute("""
-        INSERT OR REPLACE INTO character_tags (name, danbooru_post_count, created_at, other_names)
-        VALUES (?, ?, ?, ?)
-        """, (name, post_count, created_at, other_names))
+    cursor.executemany("""
+    INSERT OR REPLACE INTO character_tags (name, danbooru_post_count, created_at, other_names)
+    VALUES (?, ?, ?, ?)
+    """, rows)
 
-        logger.info(f"[INFO] Inserted: {name}")
-        time.sleep(0.5)  # interval for avoid rate limit 
+    logger.info(f"[INFO] Inserted {len(rows)} tags")
 
     conn.commit()
     conn.close()
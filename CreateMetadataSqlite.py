@@ -1,16 +1,38 @@
 import os
-import json
+import mmap
+import orjson
 import sqlite3
 from multiprocessing import Pool, cpu_count
 from functools import partial
 import argparse
 import logger_factory
-from datetime import datetime
 
 from tqdm import tqdm
 
 IMAGE_EXTENSIONS = [".png", ".jpg", ".jpeg"]
 
+# Column order of 'illusts' table. Must match the schema in 'init_db'
+COLUMNS = (
+    "filename", "id", "title", "type", "restrict", "user_name",
+    "user_account", "tags", "create_date", "page_count", "width", "height",
+    "sanity_level", "x_restrict", "total_view", "total_bookmarks",
+    "is_bookmarked", "visible", "is_muted", "illust_ai_type",
+    "illust_book_style", "num", "date", "rating", "suffix", "category",
+    "subcategory", "url", "date_url", "extension"
+)
+
+# Precompute INSERT statement once so SQLite prepares it a single time
+INSERT_SQL = f"INSERT OR REPLACE INTO illusts ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+# Number of records per executemany call when streaming
+INSERT_BATCH_SIZE = 5000
+
+# Workers beyond this only add IPC overhead on an I/O-bound parse stage
+MAX_WORKERS = 8
+
+# Below this size the mmap syscall costs more than the copy it saves
+MMAP_MIN_SIZE = 4096
+
 logger_handlers = [
     logger_factory.get_file_handler(log_prefix=os.path.basename(__file__)),
     logger_factory.get_default_stream_handler()
@@ -59,48 +81,77 @@ def init_db(path: str):
     conn.close()
 
 def find_json_files(root_dir):
-    """Find all json files in root_dir recursively"""
-    return [
-        os.path.join(dirpath, filename)
-        for dirpath, _, filenames in os.walk(root_dir)
-        for filename in filenames
-        if filename.lower().endswith(".json")
-    ]
-
-def parse_json(json_path):
+    """
+    Find all json files in root_dir recursively.
+
+    Generator yielding (json_path, image_basenames) tuples where
+    'image_basenames' is the set of image file names in the same
+    directory, so 'parse_json' can check image existence without
+    stat calls.
+
+    Walks with os.scandir directly: 'entry.path' is already joined,
+    avoiding the per-file os.path.join that os.walk consumers pay.
+    """
+    stack = [root_dir]
+    while stack:
+        dirpath = stack.pop()
+        json_paths = []
+        # Collect image names of current directory once,
+        # instead of 3 isfile checks per JSON later
+        image_basenames = set()
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".json"):
+                    json_paths.append(entry.path)
+                elif entry.name.lower().endswith(tuple(IMAGE_EXTENSIONS)):
+                    image_basenames.add(entry.name)
+        for json_path in json_paths:
+            yield (json_path, image_basenames)
+
+def parse_datetime(s):
+    """
+    Convert fixed-format Pixiv timestamp 'YYYY-MM-DDTHH:MM:SS+NN:NN'
+    to ISO 8601 format (YYYY-MM-DD HH:MM:SS+NN:NN).
+
+    Slicing skips the full datetime.fromisoformat parse and re-render
+    since the input format never varies; everything after the date,
+    including the UTC offset, is kept as-is.
+    """
+    return s[:10] + " " + s[11:] if s and len(s) >= 19 else None
+
+def parse_json(task):
     """Parsing JSON and extract metadata"""
+    # task is (json_path, image_basenames) tuple from 'find_json_files'
+    json_path, image_basenames = task
+
     # json_path e.g. /data/29/29182021_p0.jpg.json
     base_name = os.path.splitext(os.path.basename(json_path))[0]  # e.g. 29182021_p0.jpg
     base_name = os.path.splitext(base_name)[0] # e.g. 29182021_p0
-    subdir = os.path.dirname(json_path) # e.g. 29
 
     #logger.debug(f"Parsing {base_name}...")
 
-    # Check existence of image
-    found_image = None
-    for ext in IMAGE_EXTENSIONS:
-        if os.path.isfile(os.path.join(subdir, base_name + ext)):
-            found_image = True
-            break
-    if not found_image:
+    # Check existence of image by set membership (no stat syscall)
+    if not any(base_name + ext in image_basenames for ext in IMAGE_EXTENSIONS):
         return None  # If image does not exists, return None
-    
+
     try:
-        with open(json_path, "r", encoding="utf-8") as f:
-            metadata = json.load(f)
+        # orjson parses bytes directly, 3-10x faster than stdlib json.
+        # mmap larger files so page-cache-resident bytes are parsed
+        # without an extra file-sized copy into a Python buffer
+        with open(json_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size >= MMAP_MIN_SIZE:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    metadata = orjson.loads(memoryview(mm))
+            else:
+                metadata = orjson.loads(f.read())
     except Exception as e:
         logger.error(f"[ERROR] Failed to parsing JSON: {json_path} - {e}")
         return None
 
-    def parse_datetime(s):
-        try:
-            # Convert to ISO 8601 format (YYYY-MM-DD HH:MM:SS)
-            return datetime.fromisoformat(s.replace("Z", "+00:00")).isoformat(sep=' ', timespec='seconds') if s else None
-        except:
-            return None
-
     try:
-        return {
+        record = {
             "id": metadata.get("id"),
             "title": metadata.get("title"),
             "type": metadata.get("type"),
@@ -132,26 +183,43 @@ def parse_json(json_path):
             "filename": metadata.get("filename"),
             "extension": metadata.get("extension"),
         }
+        # Return values in COLUMNS order so 'insert_batch' can bind them
+        # to the precomputed INSERT statement directly
+        return tuple(record[column] for column in COLUMNS)
     except Exception as e:
         logger.error(f"[ERROR] Failed to extract field: {json_path} - {e}")
         return None
 
 def insert_batch(records, db_path):
-    """Insert records batch"""
+    """
+    Insert records batch.
+
+    'records' may be any iterable (including a generator), consumed in
+    sub-batches of INSERT_BATCH_SIZE inside one transaction.
+    Returns number of inserted records.
+    """
 
-    if not records:
-        return
-    
     conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+
+    # Reduce disk-sync traffic to one fsync at commit
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+
+    inserted = 0
 
     try:
         conn.execute("BEGIN TRANSACTION;")
+        batch = []
         for record in records:
-            placeholders = ", ".join(["?"] * len(record))
-            columns = ", ".join(record.keys())
-            sql = f"INSERT OR REPLACE INTO illusts ({columns}) VALUES ({placeholders})"
-            cursor.execute(sql, list(record.values()))
+            batch.append(record)
+            if len(batch) >= INSERT_BATCH_SIZE:
+                conn.executemany(INSERT_SQL, batch)
+                inserted += len(batch)
+                batch = []
+        if batch:
+            conn.executemany(INSERT_SQL, batch)
+            inserted += len(batch)
         conn.commit()
     except Exception as e:
         conn.rollback()
@@ -159,6 +227,8 @@ def insert_batch(records, db_path):
     finally:
         conn.close()
 
+    return inserted
+
 def main():
     parser = argparse.ArgumentParser(
         description="Create metadata database from .json file. Table scheme is match to 'Pixiv API'"
@@ -188,19 +258,26 @@ def main():
     init_db(args.db_path)
 
     logger.info(f"Search JSON files in {args.root_path}")
-    json_files = find_json_files(args.root_path)
+    # Materialize here only for the tqdm total below
+    json_files = list(find_json_files(args.root_path))
 
     logger.info(f"Start multiprocessing...")
 
-    with Pool(processes=cpu_count()) as pool:
-        results = pool.map(parse_json, json_files)
+    # imap_unordered streams results as they finish, so parsing overlaps
+    # with insertion and peak memory is bounded by the chunksize
+    with Pool(processes=min(cpu_count(), MAX_WORKERS)) as pool:
+        results = pool.imap_unordered(parse_json, json_files, chunksize=256)
+
+        # filtering none lazily
+        valid_records = (
+            result for result in tqdm(results, total=len(json_files))
+            if result is not None
+        )
 
-    # filtering none
-    valid_records = [result for result in tqdm(results, total=len(json_files)) if result is not None]
-    logger.info(f"valid records: {len(valid_records)}")
+        logger.info("Insert into db by transaction...")
+        inserted = insert_batch(valid_records, args.db_path)
 
-    logger.info("Insert into db by transaction...")
-    insert_batch(valid_records, args.db_path)
+    logger.info(f"valid records: {inserted}")
 
     logger.info("Complete!")
 
@@ -1,6 +1,5 @@
 import sqlite3
 import json
-import re
 import argparse
 import os
 import logger_factory
@@ -11,17 +10,24 @@ logger_handlers = [
 ]
 logger = logger_factory.get_custom_handlers_logger(__file__, logger_handlers)
 
-# Regex to check Japanese (hiragana, katakana, kanji)
-JPN_PATTERN = re.compile(r'[\u3040-\u30FF\u4E00-\u9FFF]')
-
 TABLE_NAME = "character_tags"
 COLUMN_NAME = "other_names"
 
 def is_japanese(text: str):
     """
-    Check 'text' has jpapanese character
+    Check 'text' has jpapanese character (hiragana, katakana, kanji)
     """
-    return bool(JPN_PATTERN.search(text))
+    # Fast path: str.isascii is a single C-level scan and most
+    # non-Japanese aliases are pure ASCII
+    if text.isascii():
+        return False
+
+    for c in text:
+        o = ord(c)
+        if 0x3040 <= o <= 0x30FF or 0x4E00 <= o <= 0x9FFF:
+            return True
+
+    return False
 
 def main(alias_db_path: str, target_path: str):
 
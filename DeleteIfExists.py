@@ -19,27 +19,34 @@ def delete_if_exists(root_path: str, file_name: str, abs_path: str):
 
     logger.debug(f"Check {target_path}")
 
-    if os.path.exists(target_path):
-        if os.path.exists(abs_path):
-            try:
-                os.remove(abs_path)
-                logger.debug(f"{abs_path} is deleted")
-            except Exception as e:
-                logger.debug(f"Failed to delete {abs_path}")
-                sys.exit(1)
-
-            if os.path.exists(abs_path + ".json"):
-                try:
-                    os.remove(abs_path + ".json")
-                    logger.debug(f"{abs_path + ".json"} is deleted")
-                except Exception as e:
-                    logger.debug(f"Failed to delete {abs_path + ".json"}")
-            else:
-                logger.debug(f"{abs_path + ".json"} does not exists yet.")
-        else:
-            logger.debug(f"{abs_path} does not exists.")
-    else: 
+    # Single stat instead of os.path.exists chains.
+    # gallery-dl runs this script once per downloaded file,
+    # so every syscall counts
+    try:
+        os.stat(target_path)
+    except FileNotFoundError:
         logger.debug(f"{target_path} does not exists...")
+        return
+
+    # Remove directly and treat a missing file as already handled.
+    # This is one syscall and race-free compared to exists + remove
+    try:
+        os.remove(abs_path)
+        logger.debug(f"{abs_path} is deleted")
+    except FileNotFoundError:
+        logger.debug(f"{abs_path} does not exists.")
+        return
+    except Exception as e:
+        logger.debug(f"Failed to delete {abs_path}")
+        sys.exit(1)
+
+    try:
+        os.remove(abs_path + ".json")
+        logger.debug(f"{abs_path + ".json"} is deleted")
+    except FileNotFoundError:
+        logger.debug(f"{abs_path + ".json"} does not exists yet.")
+    except Exception as e:
+        logger.debug(f"Failed to delete {abs_path + ".json"}")
 
 if __name__ == "__main__":
 
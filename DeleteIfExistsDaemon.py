@@ -0,0 +1,93 @@
+import argparse
+import os
+import sys
+
+import logger_factory
+
+from DeleteIfExists import delete_if_exists
+
+logger_handlers = [
+    logger_factory.get_file_handler(log_prefix=os.path.basename(__file__)),
+    logger_factory.get_default_stream_handler()
+]
+logger = logger_factory.get_custom_handlers_logger(__file__, logger_handlers)
+
+def handle_line(line: str):
+    """
+    Handle one tab-seperated '(root_path, file_name, abs_path)' request line
+    """
+
+    fields = line.rstrip("\n").split("\t")
+
+    if len(fields) != 3:
+        logger.warning(f"Invalid request line: {line!r}")
+        return
+
+    root_path, file_name, abs_path = fields
+
+    # delete_if_exists follows the one-shot script contract and calls
+    # sys.exit on failure; the daemon must survive a bad request and
+    # keep draining the pipe (a dead reader blocks every writer), so
+    # trap both SystemExit and unexpected errors per line
+    try:
+        delete_if_exists(root_path, file_name, abs_path)
+    except SystemExit:
+        logger.error(f"Delete failed for request: {line!r}")
+    except Exception as e:
+        logger.error(f"Unexpected error for request {line!r}: {e}")
+
+def serve(pipe_path: str | None = None):
+    """
+    Long-lived alternative to running 'DeleteIfExists.py' as a subprocess
+    per downloaded file.
+
+    Interpreter startup plus imports (~100ms) dominates the actual
+    file-op cost (one stat + unlink), so this daemon reads
+    tab-seperated '(root_path, file_name, abs_path)' lines from stdin
+    or a named pipe and calls 'delete_if_exists' for each.
+
+    To use with gallery-dl, start this script with '--pipe' and replace
+    the '--exec' python call with a cheap shell write, e.g.
+
+        --exec "printf '%s\\t%s\\t%s\\n' \"{root}\" \"{_filename}\" \"{_path}\" > /tmp/delete_if_exists.pipe"
+    """
+
+    if pipe_path is None:
+        logger.info("Read requests from stdin...")
+        for line in sys.stdin:
+            handle_line(line)
+        return
+
+    # Create the named pipe if not exists
+    if not os.path.exists(pipe_path):
+        os.mkfifo(pipe_path)
+
+    logger.info(f"Read requests from named pipe {pipe_path}...")
+
+    # Reading a FIFO hits EOF whenever a writer closes it,
+    # so reopen and keep serving until interrupted
+    while True:
+        with open(pipe_path, "r", encoding="utf-8") as pipe:
+            for line in pipe:
+                handle_line(line)
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(
+        description="Long-lived DeleteIfExists helper. Reads tab-seperated "
+        "(root_path, file_name, abs_path) lines from stdin or a named pipe, "
+        "avoiding one Python interpreter startup per downloaded file"
+    )
+
+    parser.add_argument(
+        "--pipe",
+        type=str,
+        help="path of named pipe to read requests from. If omitted, read from stdin"
+    )
+
+    args = parser.parse_args()
+
+    try:
+        serve(args.pipe)
+    except KeyboardInterrupt:
+        logger.info("Daemon stopped")
@@ -1,7 +1,6 @@
 import os
 import re
 import sys
-import shutil
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import logger_factory
 
@@ -14,6 +13,22 @@ MAX_WORKERS = 8
 # Regular expression for matching filename
 pattern = re.compile(r'^(?P<id>\d{6,10})_p\d+\.(jpg|png|zip)$')
 
+# Name of filename -> prefix index file
+INDEX_FILE_NAME = 'prefix_index.tsv'
+
+def write_prefix_index(source_dir: str, buckets: dict):
+    """
+    Persist filename -> prefix map of this run
+
+    Downstream scripts that process the same file set can load this
+    instead of re-matching every filename
+    """
+    index_path = os.path.join(source_dir, INDEX_FILE_NAME)
+    with open(index_path, 'w', encoding='utf-8') as f:
+        for prefix, file_names in buckets.items():
+            for file_name in file_names:
+                f.write(f"{file_name}\t{prefix}\n")
+
 def distribute_files_by_id(source_dir:str):
     """
     Distribute files by id prefix(id[:2])
@@ -21,36 +36,52 @@ def distribute_files_by_id(source_dir:str):
 
     logger = logger_factory.get_default_logger(__name__)
     
-    # Collect file list 
-    all_files = os.listdir(source_dir)
-
-    # Define move file work
-    def move_file(file_name: str, source_dir: str):
-        try:
-            # if JSON metadata file, base_name will be images name 
-            base_name = file_name[:-5] if file_name.endswith('.json') else file_name
-            match = pattern.match(base_name)
-            
-            if not match:
-                return  # if ont match to regex, then ignore
-
-            id_part = match.group("id")
-            prefix = id_part[:2]
-            target_dir = os.path.join(source_dir, prefix)
-
-            #make directory if not exists (to prevent race condition)
-            os.makedirs(target_dir, exist_ok=True)
-
-            src_path = os.path.join(source_dir, file_name)
-            dst_path = os.path.join(target_dir, file_name)
-
-            shutil.move(src_path, dst_path)
-        except Exception as e:
-            logger.error(f"{file_name}: {e}")
-
+    # Collect file list.
+    # scandir's DirEntry carries file type from the directory read,
+    # so no extra stat syscall per entry
+    all_files = [
+        entry.name for entry in os.scandir(source_dir)
+        if entry.is_file(follow_symlinks=False)
+    ]
+
+    # Bucket files by id prefix so each target directory is created
+    # once and each worker moves into one directory at a time,
+    # keeping the kernel dentry cache warm
+    buckets: dict[str, list[str]] = {}
+
+    for file_name in all_files:
+        # if JSON metadata file, base_name will be images name
+        base_name = file_name[:-5] if file_name.endswith('.json') else file_name
+        match = pattern.match(base_name)
+
+        if not match:
+            continue  # if ont match to regex, then ignore
+
+        buckets.setdefault(match.group("id")[:2], []).append(file_name)
+
+    try:
+        write_prefix_index(source_dir, buckets)
+    except Exception as e:
+        logger.warning(f"Failed to write prefix index: {e}")
+
+    # Define move bucket work
+    def move_bucket(prefix: str, file_names: list):
+        target_dir = os.path.join(source_dir, prefix)
+
+        # make directory once per prefix instead of once per file
+        os.makedirs(target_dir, exist_ok=True)
+
+        for file_name in file_names:
+            try:
+                # same filesystem: os.replace is one rename syscall
+                os.replace(os.path.join(source_dir, file_name),
+                           os.path.join(target_dir, file_name))
+            except Exception as e:
+                logger.error(f"{file_name}: {e}")
 
     with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-        futures = [executor.submit(move_file, file, source_dir) for file in all_files]
+        futures = [executor.submit(move_bucket, prefix, file_names)
+                   for prefix, file_names in buckets.items()]
 
         for future in as_completed(futures):
             pass  # wait for complete (and catch exception)
@@ -66,22 +97,24 @@ def restore_files_to_source(source_dir: str):
     
     tasks = []
 
-    # Collect only subdirectory's entries
-    for entry in os.listdir(source_dir):
-        subdir_path = os.path.join(source_dir, entry)
-        if os.path.isdir(subdir_path):
-            for file_name in os.listdir(subdir_path):
-                src_path = os.path.join(subdir_path, file_name)
-                dst_path = os.path.join(source_dir, file_name)
+    # Collect only subdirectory's entries.
+    # is_dir uses the cached d_type instead of a stat per entry
+    for entry in os.scandir(source_dir):
+        if entry.is_dir(follow_symlinks=False):
+            subdir_path = entry.path
+            for sub_entry in os.scandir(subdir_path):
+                src_path = sub_entry.path
+                dst_path = os.path.join(source_dir, sub_entry.name)
                 tasks.append((src_path, dst_path, subdir_path))
 
     def move_file(src_path, dst_path, subdir_path):
-        
+
         try:
             if os.path.exists(dst_path):
                 logger.warning(f"{os.path.basename(dst_path)} already exists in source. Skipping.")
                 return
-            shutil.move(src_path, dst_path)
+            # same filesystem: one rename syscall, no copy fallback probe
+            os.replace(src_path, dst_path)
         except Exception as e:
             logger.error(f"Failed to move {src_path}: {e}")
 
@@ -91,10 +124,9 @@ def restore_files_to_source(source_dir: str):
             pass  # wait for complete (and catch exception)
 
     # Delete empty directory after all tasks complete
-    for entry in os.listdir(source_dir):
-        subdir_path = os.path.join(source_dir, entry)
-        if os.path.isdir(subdir_path) and not os.listdir(subdir_path):
-            os.rmdir(subdir_path)
+    for entry in os.scandir(source_dir):
+        if entry.is_dir(follow_symlinks=False) and not os.listdir(entry.path):
+            os.rmdir(entry.path)
 
     logger.info("Restore Complete")
 
@@ -1,21 +1,39 @@
 import os
 
 def fix_png_filenames(root_dir):
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        for filename in filenames:
-            if filename.endswith("png") and not filename.endswith(".png"):
-                old_path = os.path.join(dirpath, filename)
-                new_filename = filename[:-3] + ".png"
-                new_path = os.path.join(dirpath, new_filename)
+    # iterative scandir walk: one directory read per dir, no stat per entry
+    stack = [root_dir]
+    while stack:
+        dir_path = stack.pop()
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
 
-                # 이름이 충돌하지 않을 경우에만 변경
-                if not os.path.exists(new_path):
-                    os.rename(old_path, new_path)
-                    print(f"Renamed: {old_path} -> {new_path}")
-                else:
-                    print(f"Skipped (already exists): {new_path}")
+                if entry.name.endswith("png") and not entry.name.endswith(".png"):
+                    new_path = os.path.join(dir_path, entry.name[:-3] + ".png")
+
+                    # link+unlink instead of exists-check + rename:
+                    # no extra syscall per file and no TOCTOU race
+                    # (rename would overwrite an existing target)
+                    try:
+                        os.link(entry.path, new_path)
+                    except FileExistsError:
+                        print(f"Skipped (already exists): {new_path}")
+                        continue
+                    except OSError:
+                        # filesystem without hard links (FAT/exFAT
+                        # removable drives): fall back to the checked
+                        # rename
+                        if os.path.exists(new_path):
+                            print(f"Skipped (already exists): {new_path}")
+                            continue
+                        os.rename(entry.path, new_path)
+                        print(f"Renamed: {entry.path} -> {new_path}")
+                        continue
+                    os.unlink(entry.path)
+                    print(f"Renamed: {entry.path} -> {new_path}")
 
 if __name__ == "__main__":
     fix_png_filenames("H:/CharacterTags/images")
-
-    
@@ -1,13 +1,14 @@
 import os
 import lmdb
 import json
+import queue
 import tarfile
 import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
 from pathlib import Path
 
-from PIL import Image
-from io import BytesIO
-
 from logger_factory import get_custom_handlers_logger, get_file_handler, get_default_stream_handler
 
 # Assume logger is defined elsewhere and injected into this script
@@ -17,19 +18,46 @@ logger_handlers = [
 ]
 logger = get_custom_handlers_logger(__file__, logger_handlers)
 
+# Magic bytes of supported image formats (PNG / JPEG)
+IMAGE_MAGIC_BYTES = (b"\x89PNG", b"\xff\xd8")
+
+def walk_files(root, exts):
+    """
+    Yield paths of all files under 'root' whose name ends with 'exts'.
+
+    One os.scandir pass per directory, unlike rglob which traverses
+    the whole tree once per pattern and stats every entry.
+    """
+    stack = [str(root)]
+    while stack:
+        dir_path = stack.pop()
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(exts):
+                    yield entry.path
+
 def encode_image(file_path):
     """
-    Opens and encodes an image file into bytes.
+    Reads an image file into bytes.
     This is used to store the image data into LMDB.
+
+    The original encoded bytes are stored as-is; a magic-byte check
+    replaces the old full Pillow decode + re-encode round trip.
     """
     try:
-        with Image.open(file_path) as img:
-            with BytesIO() as buffer:
-                img.save(buffer, format=img.format or 'PNG')
-                logger.debug(f"Encoded image: {file_path}")
-                return buffer.getvalue()
+        with open(file_path, "rb") as f:
+            data = f.read()
+
+        if not data.startswith(IMAGE_MAGIC_BYTES):
+            logger.warning(f"Not a PNG/JPEG file, skipping: {file_path}")
+            return None
+
+        logger.debug(f"Read image: {file_path}")
+        return data
     except Exception as e:
-        logger.warning(f"Failed to encode {file_path}: {e}")
+        logger.warning(f"Failed to read {file_path}: {e}")
         return None
 
 def process_images_to_lmdb(dataset_root, lmdb_path, batch_size):
@@ -44,56 +72,126 @@ def process_images_to_lmdb(dataset_root, lmdb_path, batch_size):
     """
     try:
         logger.info(f"Opening LMDB environment at {lmdb_path} with map size of 500GB")
-        env = lmdb.open(str(lmdb_path), map_size=1 << 39)
+        # writemap/sync flags defer all fsyncs to the single
+        # env.sync(force=True) after the load completes
+        env = lmdb.open(str(lmdb_path), map_size=1 << 39,
+                        writemap=True, metasync=False, sync=False, map_async=True)
     except Exception as e:
         logger.error(f"Failed to open LMDB environment: {e}")
         return
 
     try:
-        image_files = list(dataset_root.rglob("*.png")) + list(dataset_root.rglob("*.jpg"))
-        logger.info(f"Found {len(image_files)} image files to process")
+        # Stream paths from a walker thread through a bounded queue so
+        # the resident set stays O(batch) instead of O(files), and
+        # directory traversal overlaps the encode/write work
+        path_queue = queue.Queue(maxsize=batch_size * 4)
+
+        def produce():
+            try:
+                for path in walk_files(dataset_root, (".png", ".jpg")):
+                    path_queue.put(path)
+            finally:
+                path_queue.put(None)  # sentinel: traversal finished
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
 
         count = 0
-        txn = env.begin(write=True)
+        batch = []          # (key, value) tuples for putmulti
+        batch_paths = []    # source files of the current batch
+        use_append = True   # until a batch proves keys non-monotonic
+
+        # Source files of committed batches. With sync=False a commit
+        # is not durable until the final env.sync, so deletions are
+        # queued here and only run after that sync; a crash mid-run
+        # then leaves every source file still on disk
+        pending_deletes = []
+
+        # small thread pool so the unlinks themselves run in parallel
+        deleter = ThreadPoolExecutor(max_workers=4)
+
+        def delete_paths(paths):
+            for path in paths:
+                try:
+                    os.remove(path)
+                    logger.debug(f"Deleted original image file: {path}")
+                except Exception as e:
+                    logger.warning(f"Could not remove {path}: {e}")
+
+        def flush_batch():
+            """Write current batch with one putmulti, then delete its sources"""
+            nonlocal count, use_append
+
+            if not batch:
+                return
+
+            # Sorted batches dirty far fewer B-tree pages even when
+            # append mode is not possible
+            batch.sort(key=itemgetter(0))
+
+            written = False
+
+            if use_append:
+                # putmulti reports how many entries it added; append
+                # mode silently skips keys that are not monotonic, so
+                # the count must be verified
+                try:
+                    with env.begin(write=True) as txn:
+                        with txn.cursor() as cursor:
+                            _, added = cursor.putmulti(batch, append=True)
+                    written = added == len(batch)
+                except lmdb.Error:
+                    written = False
+
+                if not written:
+                    # Keys are not monotonic across batches; stop
+                    # trying append mode and use plain sorted puts
+                    use_append = False
+
+            if not written:
+                with env.begin(write=True) as txn:
+                    with txn.cursor() as cursor:
+                        cursor.putmulti(batch)
+
+            count += len(batch)
+            logger.info(f"Committed {count} images to LMDB")
+
+            # not durable yet: queue the sources for deletion after
+            # the final sync
+            pending_deletes.append(list(batch_paths))
+
+            batch.clear()
+            batch_paths.clear()
+
+        while True:
+            img_path = path_queue.get()
+            if img_path is None:
+                break
 
-        for img_path in image_files:
             try:
-                key = img_path.name.encode()  # Use only the file name as the LMDB key
                 value = encode_image(img_path)
 
                 if value is not None:
-                    txn.put(key, value)
-                    logger.debug(f"Inserted {img_path.name} into LMDB")
-                    count += 1
-
-                    if count % batch_size == 0:
-                        txn.commit()
-                        logger.info(f"Committed {count} images to LMDB")
-
-                        for i in range(count - batch_size, count):
-                            try:
-                                os.remove(image_files[i])
-                                logger.debug(f"Deleted original image file: {image_files[i]}")
-                            except Exception as e:
-                                logger.warning(f"Could not remove {image_files[i]}: {e}")
-
-                        txn = env.begin(write=True)
+                    # Use only the file name as the LMDB key
+                    batch.append((os.path.basename(img_path).encode(), value))
+                    batch_paths.append(img_path)
+                    logger.debug(f"Buffered {img_path} for LMDB")
+
+                    if len(batch) >= batch_size:
+                        flush_batch()
             except Exception as e:
                 logger.error(f"Error processing file {img_path}: {e}")
 
-        try:
-            txn.commit()
-            logger.info(f"Final commit completed: {count} total images")
-        except Exception as e:
-            logger.error(f"Failed to commit final batch: {e}")
-            txn.abort()
+        flush_batch()
+        logger.info(f"Final commit completed: {count} total images")
 
-        for i in range(count - (count % batch_size), count):
-            try:
-                os.remove(image_files[i])
-                logger.debug(f"Deleted original image file: {image_files[i]}")
-            except Exception as e:
-                logger.warning(f"Could not remove {image_files[i]}: {e}")
+        # One durable fsync for the whole load
+        env.sync(True)
+
+        # every image now has a durable LMDB copy; the sources can go
+        for paths in pending_deletes:
+            deleter.submit(delete_paths, paths)
+        deleter.shutdown(wait=True)
 
     except Exception as e:
         logger.error(f"Unexpected error during LMDB processing: {e}")
@@ -108,16 +206,38 @@ def archive_json_files(dataset_root):
     This preserves metadata while reducing the file count.
     """
     try:
-        json_files = list(dataset_root.rglob("*.json"))
+        # Collect (path, inode) pairs and sort by inode so the archive
+        # reads the files in roughly on-disk order (fewer seeks on HDD)
+        json_files = []
+        stack = [str(dataset_root)]
+        while stack:
+            dir_path = stack.pop()
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.lower().endswith(".json"):
+                        json_files.append((entry.path, entry.inode()))
+
         if not json_files:
             logger.info("No JSON files found to archive.")
             return
 
+        json_files.sort(key=itemgetter(1))
+
         archive_path = dataset_root / "metadata_jsons.tar"
-        with tarfile.open(archive_path, "w") as tar:
-            for json_file in json_files:
+        # 1MiB record buffer instead of the 10KiB default
+        with tarfile.open(archive_path, "w", bufsize=1 << 20) as tar:
+            for json_file, _ in json_files:
                 try:
-                    tar.add(json_file, arcname=json_file.relative_to(dataset_root))
+                    # addfile with a hand-filled TarInfo: one stat per
+                    # file, no tar.add re-stat / mode mapping
+                    stat = os.stat(json_file)
+                    tarinfo = tarfile.TarInfo(os.path.relpath(json_file, dataset_root))
+                    tarinfo.size = stat.st_size
+                    tarinfo.mtime = int(stat.st_mtime)
+                    with open(json_file, "rb") as f:
+                        tar.addfile(tarinfo, f)
                     logger.debug(f"Added {json_file} to archive")
                 except Exception as e:
                     logger.warning(f"Failed to add {json_file} to archive: {e}")
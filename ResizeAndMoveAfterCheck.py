@@ -1,5 +1,4 @@
 import os
-import shutil
 import re
 import argparse
 from PIL import Image
@@ -16,14 +15,61 @@ VALID_EXTS = ('.jpg', '.jpeg', '.png')
 
 pattern = re.compile(r'^(?P<id>\d{6,10})_p\d+\.(jpg|jpeg|png)$', re.IGNORECASE)
 
+# Module-level logger: built once per process at import time instead of
+# on every processed file
+logger = get_default_logger(__name__)
+
+# Name of filename -> prefix index file (written by DistributeFilesById)
+INDEX_FILE_NAME = 'prefix_index.tsv'
+
+# filename -> prefix map shared with worker processes
+_PREFIX_INDEX = {}
+
+def load_prefix_index(directory_path):
+    """
+    Load filename -> prefix map written by DistributeFilesById
+    (empty dict if there is no index file)
+    """
+    index = {}
+    try:
+        with open(os.path.join(directory_path, INDEX_FILE_NAME), encoding='utf-8') as f:
+            for line in f:
+                file_name, sep, prefix = line.rstrip('\n').partition('\t')
+                if sep:
+                    index[file_name] = prefix
+    except FileNotFoundError:
+        pass
+    return index
+
+def _init_worker(prefix_index):
+    """Receive the prefix index once per worker process"""
+    global _PREFIX_INDEX
+    _PREFIX_INDEX = prefix_index
+
+def fast_match(file_name):
+    """
+    Return id part of 'file_name' (or None if not match)
+
+    String fast path for the fixed '<id>_p<n>.<ext>' shape; the full
+    regex only runs for rare names the quick checks cannot decide
+    """
+    base, sep, ext = file_name.rpartition('.')
+    if not sep or ext.lower() not in ('jpg', 'jpeg', 'png'):
+        return None
+
+    head, sep2, tail = base.partition('_p')
+    if sep2 and head.isdigit() and tail.isdigit() and 6 <= len(head) <= 10:
+        return head
+
+    match = pattern.match(file_name)
+    return match.group('id') if match else None
+
 def process_single_file(full_path):
     """
     Check file exists by prefix(file_name[:2]).
     If file already exists, remove source, otherwise, move to prefix dir and remove source
     """
 
-    logger = get_default_logger(__name__)
-    
     if not os.path.isfile(full_path):
         logger.debug(f"[SKIP] There is no file: {full_path}")
         return
@@ -35,15 +81,16 @@ def process_single_file(full_path):
     json_path = full_path + '.json'
     has_json = os.path.isfile(json_path)
 
-    # check filename 
-    match = pattern.match(file_name if not file_name.endswith('.json') else name)
-    if not match:
-        logger.debug(f"[SKIP] Not match to Regex: {file_name}")
-        return
+    # check filename (index lookup first, matcher for unindexed files)
+    prefix = _PREFIX_INDEX.get(file_name)
+    if prefix is None:
+        id_part = fast_match(file_name if not file_name.endswith('.json') else name)
+        if not id_part:
+            logger.debug(f"[SKIP] Not match to Regex: {file_name}")
+            return
+        prefix = id_part[:2]
 
     # Get prefix and make directory which named prefix
-    id_part = match.group('id')
-    prefix = id_part[:2]
     target_dir = os.path.join(dir_path, prefix)
     os.makedirs(target_dir, exist_ok=True)
 
@@ -68,9 +115,10 @@ def process_single_file(full_path):
                 resized.save(save_path, format="PNG")
 
         # move json file too
+        # (same filesystem: os.replace is one rename syscall)
         if has_json:
             target_json_path = os.path.join(target_dir, os.path.basename(json_path))
-            shutil.move(json_path, target_json_path)
+            os.replace(json_path, target_json_path)
 
         # remove source file
         os.remove(full_path)
@@ -90,12 +138,18 @@ def collect_files_in_directory(directory_path):
                 files.append(os.path.join(directory_path, entry.name))
     return files
 
-def run_multiprocessing(file_paths, workers=None):
+def run_multiprocessing(file_paths, workers=None, prefix_index=None):
     """
     using multiprocessing
+
+    imap_unordered with a large chunksize sends files to workers in
+    batches (less pickling/IPC per file) and lets idle workers pull
+    the next chunk instead of waiting for ordered results
     """
-    with Pool(processes=workers or cpu_count()) as pool:
-        pool.map(process_single_file, file_paths)
+    with Pool(processes=workers or cpu_count(),
+              initializer=_init_worker, initargs=(prefix_index or {},)) as pool:
+        for _ in pool.imap_unordered(process_single_file, file_paths, chunksize=64):
+            pass
 
 if __name__ == "__main__":
 
@@ -114,7 +168,7 @@ if __name__ == "__main__":
     # If path is directory, excute recursive in directory (max-depth=1)
     if(os.path.isdir(args.path)):
         files = collect_files_in_directory(args.path)
-        run_multiprocessing(files)
+        run_multiprocessing(files, prefix_index=load_prefix_index(args.path))
     else:
         process_single_file(args.path)
         
@@ -1,17 +1,10 @@
 import os
 import re
-import shutil
-from PIL import Image
+import cv2
 import argparse
 from tqdm import tqdm
 from typing import List
-
-# Supress warning. 
-# Ignore all WARNING. only logging ERROR
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
-
-import tensorflow as tf
-import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 
 from logger_factory import get_file_handler, get_default_stream_handler, get_custom_handlers_logger
 
@@ -19,6 +12,9 @@ TARGET_SIZE = (512, 512)
 PADDING_COLOR = (0, 0, 0)
 VALID_EXTS = ('.jpg', '.jpeg', '.png')
 
+# Low compression level: PNG encode time beats the few % of extra bytes
+PNG_COMPRESSION = 1
+
 pattern = re.compile(r'^(?P<id>\d{6,10})_p\d+\.(jpg|jpeg|png)$', re.IGNORECASE)
 
 logger_handlers = [
@@ -27,6 +23,51 @@ logger_handlers = [
 ]
 logger = get_custom_handlers_logger(__file__, logger_handlers)
 
+# Name of filename -> prefix index file (written by DistributeFilesById)
+INDEX_FILE_NAME = 'prefix_index.tsv'
+
+# filename -> prefix map shared with worker processes
+_PREFIX_INDEX = {}
+
+def load_prefix_index(directory_path):
+    """
+    Load filename -> prefix map written by DistributeFilesById
+    (empty dict if there is no index file)
+    """
+    index = {}
+    try:
+        with open(os.path.join(directory_path, INDEX_FILE_NAME), encoding='utf-8') as f:
+            for line in f:
+                file_name, sep, prefix = line.rstrip('\n').partition('\t')
+                if sep:
+                    index[file_name] = prefix
+    except FileNotFoundError:
+        pass
+    return index
+
+def _init_worker(prefix_index):
+    """Receive the prefix index once per worker process"""
+    global _PREFIX_INDEX
+    _PREFIX_INDEX = prefix_index
+
+def fast_match(file_name):
+    """
+    Return id part of 'file_name' (or None if not match)
+
+    String fast path for the fixed '<id>_p<n>.<ext>' shape; the full
+    regex only runs for rare names the quick checks cannot decide
+    """
+    base, sep, ext = file_name.rpartition('.')
+    if not sep or ext.lower() not in ('jpg', 'jpeg', 'png'):
+        return None
+
+    head, sep2, tail = base.partition('_p')
+    if sep2 and head.isdigit() and tail.isdigit() and 6 <= len(head) <= 10:
+        return head
+
+    match = pattern.match(file_name)
+    return match.group('id') if match else None
+
 def collect_image_files(root_dir: str) -> List[str]:
     """
     collect only image file
@@ -40,44 +81,62 @@ def collect_image_files(root_dir: str) -> List[str]:
                 files.append(os.path.join(root_dir, entry.name))
     return files
 
-def preprocess_and_resize(image_path):
+def letterbox_resize(img, target_size=TARGET_SIZE, bg_color=PADDING_COLOR):
     """
-    Resize using tensorflow
+    Resize with preserving aspect ratio and pad to 'target_size'
     """
-    # read image
-    raw = tf.io.read_file(image_path)
-    img = tf.io.decode_image(raw, channels=3, expand_animations=False)
-
-    # convert to float (normalize)
-    img = tf.image.convert_image_dtype(img, tf.float32)
-
-    size = (TARGET_SIZE[1], TARGET_SIZE[0])
+    height, width = img.shape[:2]
+    target_width, target_height = target_size
+
+    # preserve aspect ratio
+    ratio = min(target_width / width, target_height / height)
+    new_width = int(width * ratio)
+    new_height = int(height * ratio)
+
+    resized = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_AREA)
+
+    # pad to target size
+    pad_x = target_width - new_width
+    pad_y = target_height - new_height
+    return cv2.copyMakeBorder(
+        resized,
+        pad_y // 2, pad_y - pad_y // 2,
+        pad_x // 2, pad_x - pad_x // 2,
+        cv2.BORDER_CONSTANT, value=bg_color
+    )
 
-    # resize with preserving aspect ratio
-    resized = tf.image.resize_with_pad(img, size[0], size[1], method=tf.image.ResizeMethod.AREA)
+def preprocess_and_resize(image_path):
+    """
+    Decode and resize using OpenCV.
 
-    # convert back to uint8 
-    resized = tf.image.convert_image_dtype(resized, tf.uint8)
-    return resized, image_path
+    cv2.imdecode/resize run on libjpeg-turbo/SIMD code paths and stay
+    in uint8, avoiding the old TF float32 round trip
+    """
+    img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if img is None:
+        logger.warning(f"[SKIP] Failed to decode: {image_path}")
+        return None
+    return letterbox_resize(img)
 
-def save_resized_image(resized_tensor, image_path_tensor):
+def save_resized_image(image_path):
     """
-    Save resized tensor by `.png` and move it to id-prefix sub directory with metadata (.json)
+    Resize 'image_path' and save by `.png` to id-prefix sub directory
+    with metadata (.json)
     this method remove source file
     """
-    image_path = image_path_tensor.numpy().decode("utf-8")
     dir_path, file_name = os.path.split(image_path)
     name, ext = os.path.splitext(file_name)
 
-    # check ragex
-    match = pattern.match(file_name)
-    if not match:
-        logger.debug(f"[SKIP] Not match: {file_name}")
-        return
+    # check filename (index lookup first, matcher for unindexed files)
+    prefix = _PREFIX_INDEX.get(file_name)
+    if prefix is None:
+        id_part = fast_match(file_name)
+        if not id_part:
+            logger.debug(f"[SKIP] Not match: {file_name}")
+            return
+        prefix = id_part[:2]
 
-    # get prefix and make sub directory
-    id_part = match.group('id')
-    prefix = id_part[:2]
+    # make sub directory
     target_dir = os.path.join(dir_path, prefix)
     os.makedirs(target_dir, exist_ok=True)
 
@@ -91,39 +150,33 @@ def save_resized_image(resized_tensor, image_path_tensor):
             os.remove(json_path)
         return
 
-    # convert tensor to numpy array
-    img_array = resized_tensor.numpy()
+    resized = preprocess_and_resize(image_path)
+    if resized is None:
+        return
 
-    # convert numpy array to PIL Image instance
-    img = tf.keras.utils.array_to_img(img_array)
-    img.save(final_image_path, format="PNG")
+    cv2.imwrite(final_image_path, resized, [cv2.IMWRITE_PNG_COMPRESSION, PNG_COMPRESSION])
 
-    # move metadata file 
+    # move metadata file
+    # (same filesystem: os.replace is one rename syscall)
     json_path = image_path + ".json"
     if os.path.exists(json_path):
-        shutil.move(json_path, os.path.join(target_dir, os.path.basename(json_path)))
+        os.replace(json_path, os.path.join(target_dir, os.path.basename(json_path)))
 
     # remove source
     os.remove(image_path)
     logger.debug(f"[MOVED] {file_name} → {target_dir}")
 
-def run_pipeline(image_paths, batch_size=32):
+def run_pipeline(image_paths, workers=None, prefix_index=None):
     """
-    TensorFlow tf.data.Dataset pipeline
+    Process images parallel with ProcessPoolExecutor
     """
-    ds = tf.data.Dataset.from_tensor_slices(image_paths)
-    # parallel work by map
-    ds = ds.map(preprocess_and_resize, num_parallel_calls=tf.data.AUTOTUNE)
-    #use minibatch
-    ds = ds.batch(batch_size)
-    ds = ds.prefetch(buffer_size=tf.data.AUTOTUNE)
-
     total = len(image_paths)
 
-    with tqdm(total=total, desc="Processing images", unit="image") as progress:
-        for resized_batch, path_batch in ds:
-            for i in range(resized_batch.shape[0]):
-                save_resized_image(resized_batch[i], path_batch[i])
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_init_worker,
+                             initargs=(prefix_index or {},)) as executor:
+        with tqdm(total=total, desc="Processing images", unit="image") as progress:
+            for _ in executor.map(save_resized_image, image_paths, chunksize=16):
                 # update progress bar
                 progress.update(1)
 
@@ -146,9 +199,7 @@ if __name__ == "__main__":
     if(os.path.isdir(args.path)):
         logger.info("Searching image files...")
         files = collect_image_files(args.path)
-        logger.info(f"Image count : {len(files)}. Start GPU processing...")
-        run_pipeline(files)
+        logger.info(f"Image count : {len(files)}. Start processing...")
+        run_pipeline(files, prefix_index=load_prefix_index(args.path))
     else:
-        save_resized_image(preprocess_and_resize(args.path))
-        
-
+        save_resized_image(args.path)
@@ -5,23 +5,41 @@ import sqlite3
 import argparse
 import lmdb
 import tarfile
-import tensorflow as tf
-import numpy as np
+import cv2
+import simplejpeg
 from tqdm import tqdm
 from pathlib import Path
-from io import BytesIO
 from datetime import datetime
 from typing import List
+from operator import itemgetter
+from multiprocessing import cpu_count
+from concurrent.futures import ProcessPoolExecutor
 from logger_factory import get_file_handler, get_default_stream_handler, get_custom_handlers_logger
 
-# TensorFlow warning suppression
-os.environ['TF_CPP_MIN_LOG_LEVEL'] = '3'
-
 # Constants for image extensions
 VALID_EXTS = ('.jpg', '.jpeg', '.png')
 IMAGE_EXTENSIONS = VALID_EXTS
 pattern = re.compile(r'^(?P<id>\d{6,10})_p\d+\.(jpg|jpeg|png)$', re.IGNORECASE)  # Regex for image filename
 
+# JPEG quality for re-encoded LMDB values
+JPEG_QUALITY = 90
+
+# JPEG magic bytes
+JPEG_MAGIC = b"\xff\xd8"
+
+# Column order of 'illusts' table. Must match the schema in 'init_db'
+COLUMNS = (
+    "filename", "id", "title", "type", "restrict", "user_name",
+    "user_account", "tags", "create_date", "page_count", "width", "height",
+    "sanity_level", "x_restrict", "total_view", "total_bookmarks",
+    "is_bookmarked", "visible", "is_muted", "illust_ai_type",
+    "illust_book_style", "num", "date", "rating", "suffix", "category",
+    "subcategory", "url", "date_url", "extension"
+)
+
+# Precompute INSERT statement once so SQLite prepares it a single time
+INSERT_SQL = f"INSERT OR REPLACE INTO illusts ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
 # Logger setup
 logger_handlers = [
     get_file_handler(log_prefix=os.path.basename(__file__)),
@@ -29,9 +47,22 @@ logger_handlers = [
 ]
 logger = get_custom_handlers_logger(__file__, logger_handlers)
 
+def apply_db_pragmas(conn: sqlite3.Connection):
+    """
+    Relax journaling/sync for bulk load. Losing the last batch on a
+    power cut is acceptable: data stays in LMDB and the original files
+    until deletion
+    """
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA cache_size=-262144;")      # 256MiB page cache
+    conn.execute("PRAGMA mmap_size=1073741824;")    # 1GiB mmap window
+
 def init_db(path: str):
     """CreateTable"""
     conn = sqlite3.connect(path)
+    apply_db_pragmas(conn)
     cursor = conn.cursor()
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS illusts (
@@ -70,6 +101,23 @@ def init_db(path: str):
     conn.commit()
     conn.close()
 
+def walk_files(root, exts):
+    """
+    Yield paths of all files under 'root' whose name ends with 'exts'.
+
+    One os.scandir pass per directory, unlike rglob which traverses
+    the whole tree once per pattern and stats every entry.
+    """
+    stack = [str(root)]
+    while stack:
+        dir_path = stack.pop()
+        with os.scandir(dir_path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.lower().endswith(exts):
+                    yield entry.path
+
 # Collect image files from directory
 def collect_image_files(root_dir: str) -> List[str]:
     """
@@ -90,56 +138,109 @@ def collect_all_image_files(root_path: str) -> List[str]:
 
     no max-depth limit
     """
-    
-    path = Path(root_path)
 
     try:
-        image_files = list(path.rglob("*.png") + list(path.rglob("*.jpg")))
-        return image_files
+        # one walk_files pass filters every extension together
+        # (the old rglob version also crashed: generator + list TypeError)
+        return list(walk_files(root_path, VALID_EXTS))
     except Exception as e:
         logger.error(f"Failed to collect image files: {e}")
         return None
 
-# Read and resize image to target size using TensorFlow
+def letterbox_resize(img, target_size):
+    """
+    Resize with preserving aspect ratio and pad to 'target_size'
+    """
+    height, width = img.shape[:2]
+    target_width, target_height = target_size
+
+    ratio = min(target_width / width, target_height / height)
+    new_width = int(width * ratio)
+    new_height = int(height * ratio)
+
+    resized = cv2.resize(img, (new_width, new_height), interpolation=cv2.INTER_AREA)
+
+    pad_x = target_width - new_width
+    pad_y = target_height - new_height
+    return cv2.copyMakeBorder(
+        resized,
+        pad_y // 2, pad_y - pad_y // 2,
+        pad_x // 2, pad_x - pad_x // 2,
+        cv2.BORDER_CONSTANT, value=(0, 0, 0)
+    )
+
+# Read and resize image to target size
 def preprocess_and_resize(image_path, target_size):
     """
-    Resize using tensorflow
+    Decode and resize to RGB uint8 array.
+
+    JPEGs go through simplejpeg (libjpeg-turbo); PNGs fall back to
+    cv2.imdecode. Everything stays uint8, no float round trip
     """
-    # read image
-    raw = tf.io.read_file(image_path)
-    img = tf.io.decode_image(raw, channels=3, expand_animations=False)
-
-    # convert to float (normalize)
-    img = tf.image.convert_image_dtype(img, tf.float32)
-    size = (target_size[1], target_size[0])  # Note: height, width
-
-    # resize with preserving aspect ratio
-    resized = tf.image.resize_with_pad(img, size[0], size[1], method=tf.image.ResizeMethod.AREA)
-    
-    # convert back to uint8 
-    resized = tf.image.convert_image_dtype(resized, tf.uint8)
-    return resized, image_path
-
-# Encode image tensor to PNG bytes
-def encode_image_tensor(tensor):
+    try:
+        with open(image_path, "rb") as f:
+            raw = f.read()
+
+        if raw.startswith(JPEG_MAGIC):
+            img = simplejpeg.decode_jpeg(raw, colorspace='RGB')
+        else:
+            img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+            if img is None:
+                return None
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+
+        return letterbox_resize(img, target_size)
+    except Exception as e:
+        logger.warning(f"Failed to decode {image_path}: {e}")
+        return None
+
+# Encode image array to JPEG bytes
+def encode_image_array(img):
     """
-    Encode image tensor to PNG bytes (numpy)
+    Encode RGB uint8 array to JPEG bytes.
 
-    Dtype of tensor should be `uint8`
+    JPEG values are ~10x smaller than the PNG re-encode they replace,
+    so LMDB writes far fewer bytes per image
     """
-    img = tf.io.encode_png(tensor)
-    return img.numpy()
+    return simplejpeg.encode_jpeg(img, quality=JPEG_QUALITY, colorspace='RGB')
+
+# target size shared per worker process, set by '_init_worker'
+_TARGET_SIZE = None
 
-# Store encoded image bytes into LMDB
-def store_to_lmdb(txn, key: str, image_bytes: bytes):
+def _init_worker(target_size):
     """
-    Store encoded image bytes into LMDB
+    ProcessPoolExecutor initializer.
+    Send 'target_size' to each worker exactly once
     """
-    try:
-        txn.put(key.encode(), image_bytes)
-        logger.debug(f"Stored to LMDB with key: {key}")
-    except Exception as e:
-        logger.error(f"Failed to write {key} to LMDB: {e}")
+    global _TARGET_SIZE
+    _TARGET_SIZE = target_size
+
+def process_single_image(image_path):
+    """
+    Worker: decode, resize and JPEG-encode one image.
+
+    Returns (image_path, file_name, image_bytes, record) where
+    'record' is the parsed JSON metadata or None.
+    Returns None if the file is skipped or fails to decode
+    """
+    image_path = str(image_path)
+    file_name = os.path.basename(image_path)
+
+    match = pattern.match(file_name)
+    if not match:
+        logger.debug(f"[SKIP] Not matched pattern: {file_name}")
+        return None
+
+    resized = preprocess_and_resize(image_path, _TARGET_SIZE)
+    if resized is None:
+        return None
+
+    image_bytes = encode_image_array(resized)
+
+    json_path = image_path + ".json"
+    record = parse_json(json_path) if os.path.exists(json_path) else None
+
+    return (image_path, file_name, image_bytes, record)
 
 # Parse associated JSON metadata file
 def parse_json(json_path: str):
@@ -195,68 +296,91 @@ def parse_json(json_path: str):
         logger.error(f"[ERROR] Failed to extract field: {json_path} - {e}")
         return None
 
-# Store metadata dictionary to SQLite DB
-def store_metadata_to_db(conn: sqlite3.Connection, record: dict):
+# Store metadata dictionaries to SQLite DB
+def store_metadata_to_db(conn: sqlite3.Connection, records: list):
+    """
+    Insert metadata records with one executemany and one commit,
+    so each batch costs a single fsync instead of one per row
+    """
+    if not records:
+        return
+
     try:
-        cursor = conn.cursor()
-        placeholders = ", ".join(["?"] * len(record))
-        columns = ", ".join(record.keys())
-        sql = f"INSERT OR REPLACE INTO illusts ({columns}) VALUES ({placeholders})"
-        cursor.execute(sql, list(record.values()))
+        conn.executemany(INSERT_SQL,
+                         [tuple(record[column] for column in COLUMNS) for record in records])
         conn.commit()
-        logger.debug(f"Inserted metadata into DB for ID: {record.get('id')}")
+        logger.debug(f"Inserted {len(records)} metadata records into DB")
     except Exception as e:
         logger.error(f"Failed to insert metadata into DB: {e}")
 
 # Main processing logic for directory of images
 def process_and_store(image_paths, lmdb_path: str, target_size, db_path: str, batch_size=32):
+    """
+    Decode/resize/encode run in a process pool; the main thread stays
+    the single LMDB writer, which keeps B-tree writes sequential
+    """
     env = lmdb.open(lmdb_path, map_size=1 << 39)  # Large LMDB map size
-    ds = tf.data.Dataset.from_tensor_slices(image_paths)
-    ds = ds.map(lambda path: preprocess_and_resize(path, target_size), num_parallel_calls=tf.data.AUTOTUNE)
-    ds = ds.batch(batch_size)
-    ds = ds.prefetch(buffer_size=tf.data.AUTOTUNE)
 
     conn = sqlite3.connect(db_path)
+    apply_db_pragmas(conn)
 
-    total = len(image_paths)
-    with tqdm(total=total, desc="Processing images", unit="image") as progress:
-        for resized_batch, path_batch in ds:
+    batch = []          # (key, value) tuples for putmulti
+    batch_records = []  # metadata records of the current batch
+    batch_paths = []    # source files of the current batch
 
-            # Begin LMDB transaction
-            # Transaction per batch
-            txn = env.begin(write=True)
+    def flush_batch():
+        """Write current batch in one transaction, then delete its sources"""
+        if not batch:
+            return
 
-            for i in range(resized_batch.shape[0]):
-                try:
-                    image_path = path_batch[i].numpy().decode("utf-8")
-                    file_name = os.path.basename(image_path)
-                    match = pattern.match(file_name)
-                    if not match:
-                        logger.debug(f"[SKIP] Not matched pattern: {file_name}")
-                        continue
-                    
-                    # Encode image tensor -> numpy bytes
-                    image_bytes = encode_image_tensor(resized_batch[i])
-                    store_to_lmdb(txn, file_name, image_bytes)
-
-                    json_path = image_path + ".json"
-                    if os.path.exists(json_path):
-                        record = parse_json(json_path)
-                        if record:
-                            store_metadata_to_db(conn, record)
-                        # os.remove(json_path)  # Remove JSON after processing
-
-                    os.remove(image_path)  # Remove image after processing
-                    logger.debug(f"[REMOVED] {file_name}")
-                except Exception as e:
-                    logger.warning(f"Failed to process {image_path}: {e}")
-                progress.update(1)
-            
+        # Sorted keys dirty fewer B-tree pages
+        batch.sort(key=itemgetter(0))
+
+        try:
+            with env.begin(write=True) as txn:
+                with txn.cursor() as cursor:
+                    cursor.putmulti(batch)
+        except Exception as e:
+            logger.error(f"Failed to commit batch: {e}")
+            batch.clear()
+            batch_records.clear()
+            batch_paths.clear()
+            return
+
+        store_metadata_to_db(conn, batch_records)
+
+        for path in batch_paths:
             try:
-                txn.commit()
+                os.remove(path)  # Remove image after processing
+                logger.debug(f"[REMOVED] {os.path.basename(path)}")
             except Exception as e:
-                logger.error(f"Failed to commit batch")
-                txn.abort()
+                logger.warning(f"Failed to remove {path}: {e}")
+
+        batch.clear()
+        batch_records.clear()
+        batch_paths.clear()
+
+    total = len(image_paths)
+    with ProcessPoolExecutor(max_workers=cpu_count(),
+                             initializer=_init_worker,
+                             initargs=(target_size,)) as executor:
+        with tqdm(total=total, desc="Processing images", unit="image") as progress:
+            for result in executor.map(process_single_image, image_paths, chunksize=16):
+                progress.update(1)
+
+                if result is None:
+                    continue
+
+                image_path, file_name, image_bytes, record = result
+                batch.append((file_name.encode(), image_bytes))
+                batch_paths.append(image_path)
+                if record:
+                    batch_records.append(record)
+
+                if len(batch) >= batch_size:
+                    flush_batch()
+
+    flush_batch()
 
     conn.close()
     env.close()
@@ -268,7 +392,7 @@ def archive_json_files(root_path: Path):
     This preserves metadata while reducing the file count.
     """
     try:
-        json_files = list(root_path.rglob("*.json"))
+        json_files = list(walk_files(root_path, (".json",)))
         if not json_files:
             logger.info("No JSON files found to archive.")
             return
@@ -277,7 +401,7 @@ def archive_json_files(root_path: Path):
         with tarfile.open(archive_path, "w") as tar:
             for json_file in json_files:
                 try:
-                    tar.add(json_file, arcname=json_file.relative_to(root_path))
+                    tar.add(json_file, arcname=os.path.relpath(json_file, root_path))
                     logger.debug(f"Added {json_file} to archive")
                 except Exception as e:
                     logger.warning(f"Failed to add {json_file} to archive: {e}")
@@ -1,4 +1,5 @@
 import sqlite3
+import random
 import pandas as pd
 import numpy as np
 import os
@@ -11,6 +12,7 @@ from logger_factory import get_file_handler, get_default_stream_handler, get_cus
 TABLE_NAME = "illusts"
 SAMPLE_SIZE = 20000
 BIN_COUNT = 20
+CHUNK_SIZE = 200_000
 
 logger_handlers = [
     get_file_handler(log_prefix=os.path.basename(__file__)),
@@ -18,6 +20,16 @@ logger_handlers = [
 ]
 logger = get_custom_handlers_logger(__file__, logger_handlers)
 
+def apply_db_pragmas(conn: sqlite3.Connection):
+    """
+    Apply PRAGMA for speed up bulk scan and delete
+    """
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA cache_size=-262144;")
+    conn.execute("PRAGMA mmap_size=1073741824;")
+
 def sampling_bookmarks(db_path: str, 
                     sample_size: int = SAMPLE_SIZE, bin_count = BIN_COUNT):
     
@@ -25,78 +37,121 @@ def sampling_bookmarks(db_path: str,
 
     # connet to db
     conn = sqlite3.connect(db_path)
+    apply_db_pragmas(conn)
     cursor = conn.cursor()
 
     try:
-        # load all data from db
-        df = pd.read_sql_query(f"""
-            SELECT filename, total_bookmarks
+        # cheap aggregate for the bin edges instead of loading the
+        # whole table just to call np.histogram on it
+        min_bookmarks, max_bookmarks = conn.execute(f"""
+            SELECT MIN(total_bookmarks), MAX(total_bookmarks)
             FROM {TABLE_NAME}
             WHERE total_bookmarks IS NOT NULL
-        """, conn)
+        """).fetchone()
     except Exception as e:
         logger.error(f"error has occured : {e}")
         return
 
-    # devide to distribution range
-    counts, bin_edges = np.histogram(df['total_bookmarks'], bins=bin_count)
-
-    # cut by bin_edges using pandas.cut
-    df['bin'] = pd.cut(df['total_bookmarks'], bins=bin_edges, labels=False, include_lowest=True)
+    if min_bookmarks is None:
+        logger.error("no records with total_bookmarks")
+        return
 
     # sampling per bin size
+    # one reservoir (Algorithm R) per bin keeps memory at
+    # O(sample_size) while the table streams through in chunks
     samples_per_bin = sample_size // bin_count
-    sampled_filenames = []
-
-    # for each bin group
-    for bin_id in range(bin_count):
-        bin_group = df[df['bin'] == bin_id]
-
-        """
-        # if length of current bin gruop less than 60% of bin count per samples, 
-        # don't add to sample
-        if len(bin_group) <= samples_per_bin * 0.6:
-            continue
-        """
-
-        n = min(len(bin_group), samples_per_bin)
-        if n > 0:
-            sampled = bin_group.sample(n, random_state=42)['filename'].tolist()
-            sampled_filenames.extend(sampled)
-
-    sampled_filenames_set = set(sampled_filenames)
-
-    # get all id list and 
-    all_filenames = df['filename'].tolist()
+    rng = random.Random(42)
+    reservoirs = [[] for _ in range(bin_count)]
+    seen = [0] * bin_count
+    record_count = 0
+
+    chunks = pd.read_sql_query(f"""
+        SELECT filename, total_bookmarks
+        FROM {TABLE_NAME}
+        WHERE total_bookmarks IS NOT NULL
+    """, conn, chunksize=CHUNK_SIZE)
+
+    for chunk in chunks:
+        record_count += len(chunk)
+
+        # bins are equal-width, so scale-and-floor arithmetic replaces
+        # the per-value searchsorted of digitize/histogram; integer
+        # math keeps bin boundaries exact (bookmark counts are ints)
+        values = chunk['total_bookmarks'].to_numpy()
+        if max_bookmarks > min_bookmarks:
+            bins = (values - min_bookmarks) * bin_count // (max_bookmarks - min_bookmarks)
+            np.clip(bins, 0, bin_count - 1, out=bins)
+        else:
+            bins = np.zeros(len(values), dtype=np.int64)
+
+        for filename, bin_id in zip(chunk['filename'].values, bins):
+            seen[bin_id] += 1
+            reservoir = reservoirs[bin_id]
+            if len(reservoir) < samples_per_bin:
+                reservoir.append(filename)
+            else:
+                slot = rng.randrange(seen[bin_id])
+                if slot < samples_per_bin:
+                    reservoir[slot] = filename
+
+    sampled_filenames = [filename for reservoir in reservoirs for filename in reservoir]
+
+    # counts come from lengths; no need to build two big sets of
+    # filenames just for logging
+    logger.info(f"Records count : {record_count}")
+    logger.info(f"To delete records cound: {record_count - len(sampled_filenames)}")
+    logger.info(f"Sample records count: {len(sampled_filenames)}")
 
-    #set calculation. it's fast
-    to_delete_filenames = list(set(all_filenames) - sampled_filenames_set)
+    # keep-set swap: copy the survivors into a new table and rename it
+    # over the old one. O(sample) work instead of deleting O(N) rows
+    conn.execute("PRAGMA foreign_keys=OFF;")
 
-    logger.info(f"Records count : {len(all_filenames)}")
-    logger.info(f"To delete records cound: {len(to_delete_filenames)}")
-    logger.info(f"Sample records count: {len(sampled_filenames)}")
+    # take the write lock up front instead of upgrading a deferred
+    # transaction mid-way
+    conn.isolation_level = "IMMEDIATE"
 
-    # execute DELETE query
     with conn:
         # create temp table and insert all sampled filenames
-        # temp table exists only while the connection is open
-        conn.execute("CREATE TEMP TABLE samples (filename TEXT PRIMARY KEY)")
-        conn.executemany("""
-            INSERT INTO samples(filename) VALUES (?)
-        """, [(fn, ) for fn in sampled_filenames])
-
-        # delete with subquery that references temp table
+        # temp table exists only while the connection is open.
+        # plain table during load, unique index built once afterwards
+        # instead of a btree insert per row
+        conn.execute("CREATE TEMP TABLE samples (filename TEXT)")
+        conn.executemany(
+            "INSERT INTO samples(filename) VALUES (?)",
+            ((filename,) for filename in sampled_filenames)
+        )
+        conn.execute("CREATE UNIQUE INDEX samples_filename ON samples(filename)")
+
+        # recreate the table from its original definition: CREATE
+        # TABLE ... AS SELECT would drop the PRIMARY KEY and other
+        # constraints that downstream scripts rely on
+        create_sql = conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='table' AND name=?",
+            (TABLE_NAME,)
+        ).fetchone()[0]
+        index_sqls = [row[0] for row in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL",
+            (TABLE_NAME,)
+        )]
+
+        conn.execute(create_sql.replace(TABLE_NAME, f"{TABLE_NAME}_new", 1))
         conn.execute(f"""
-            DELETE FROM {TABLE_NAME} 
-            WHERE filename NOT IN (
-                SELECT filename FROM samples
-            )
+            INSERT INTO {TABLE_NAME}_new
+            SELECT * FROM {TABLE_NAME}
+            WHERE filename IN (SELECT filename FROM samples)
         """)
+        conn.execute(f"DROP TABLE {TABLE_NAME}")
+        conn.execute(f"ALTER TABLE {TABLE_NAME}_new RENAME TO {TABLE_NAME}")
+
+        # the old table's secondary indexes went away with the DROP
+        for index_sql in index_sqls:
+            conn.execute(index_sql)
 
-    # complete and save 
+    # complete and save
     conn.commit()
 
     # vacuum to compact size of db file
+    # (cheap now: it only rewrites the surviving rows)
     try:
         logger.info("Vaccum db...")
         conn.execute("VACUUM;")
@@ -1,5 +1,4 @@
 import sqlite3
-from collections import Counter
 import argparse
 import os
 
@@ -12,30 +11,44 @@ logger_handlers = [
 logger = logger_factory.get_custom_handlers_logger(__file__, logger_handlers)
 
 
+def apply_db_pragmas(conn: sqlite3.Connection):
+    """
+    Apply PRAGMA for speed up bulk scan
+    """
+    conn.execute("PRAGMA journal_mode=WAL;")
+    conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA temp_store=MEMORY;")
+    conn.execute("PRAGMA cache_size=-262144;")
+    conn.execute("PRAGMA mmap_size=1073741824;")
+
 def count_tags_from_pixiv_metadata(db_path: str, target_path: str):
 
     logger.info("Load database...")
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+    conn = sqlite3.connect(db_path)
+    apply_db_pragmas(conn)
+    cursor = conn.cursor()
 
-        cursor.execute("SELECT tags FROM illusts")
+    try:
+        # Split and count tags inside SQLite (recursive CTE + GROUP BY)
+        # instead of fetching every row into a Python Counter
+        cursor.execute("""
+            WITH RECURSIVE split(tag, rest) AS (
+                SELECT '', trim(tags) || ',' FROM illusts
+                UNION ALL
+                SELECT substr(rest, 1, instr(rest, ',') - 1),
+                       substr(rest, instr(rest, ',') + 1)
+                FROM split
+                WHERE rest != ''
+            )
+            SELECT tag, COUNT(*) FROM split WHERE tag != '' GROUP BY tag
+        """)
+        tag_counts = cursor.fetchall()
     except Exception as e:
         logger.error(f"Invalid database scheme : {e}")
         return
-
-    tag_counter = Counter()
-
-    for row in cursor:
-        tag_string: str = row[0]
-
-        # split tags to list
-        tags = tag_string.strip().split(",")
-
-        # update to counter
-        tag_counter.update(tags)
-
-    conn.close()
+    finally:
+        # close also checkpoints the WAL of the source database
+        conn.close()
 
     logger.info(f"Counting complete! Save to {target_path}...")
 
@@ -43,6 +56,11 @@ def count_tags_from_pixiv_metadata(db_path: str, target_path: str):
 
     output_cursor = output_conn.cursor()
 
+    # output database is written once from scratch, so journaling and
+    # fsync can be relaxed for the bulk insert
+    output_cursor.execute("PRAGMA journal_mode=MEMORY;")
+    output_cursor.execute("PRAGMA synchronous=OFF;")
+
     output_cursor.execute("""
         CREATE TABLE IF NOT EXISTS tag_counts (
             tag TEXT PRIMARY KEY,
@@ -54,12 +72,16 @@ def count_tags_from_pixiv_metadata(db_path: str, target_path: str):
         output_cursor.execute("BEGIN TRANSACTION;")
         output_cursor.executemany(
             "INSERT INTO tag_counts(tag, count) VALUES (?, ?)",
-            tag_counter.items()
+            tag_counts
         )
         output_conn.commit()
     except Exception as e:
         logger.error("Save fail! rollback now...")
         output_conn.rollback()
+    finally:
+        # close on both paths: the rollback branch used to leak the
+        # handle, keeping the journal file behind
+        output_conn.close()
 
 if __name__ == "__main__":
         
@@ -1,12 +1,24 @@
 import logging
 import sys
 import datetime
+import functools
 from pathlib import Path
 from typing import List
 
 LOG_DIR_PATH = Path(__file__).resolve().parent / 'logs'
 LOG_FORMAT = "%(asctime)s | %(levelname)s | %(name)s | %(message)s"
 
+# log file date, fixed once per process
+_TODAY = datetime.date.today()
+
+@functools.lru_cache(maxsize=8)
+def _formatter(log_format: str) -> logging.Formatter:
+    """
+    Formatter is stateless, so one instance per format string is
+    enough (handlers can share it); avoids reparsing the format
+    """
+    return logging.Formatter(log_format)
+
 def get_default_logger(name : str) -> logging.Logger:
     """
     get logger with default setting
@@ -37,29 +49,26 @@ def get_custom_handlers_logger(
     return logger
 
 def get_default_file_handler(log_format : str = LOG_FORMAT) -> logging.FileHandler:
-    file_formatter = logging.Formatter(log_format)
     file_handler = logging.FileHandler(
-        f"{LOG_DIR_PATH}/{datetime.datetime.now().date()}.log",
+        f"{LOG_DIR_PATH}/{_TODAY}.log",
         encoding="utf-8"
     )
     file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(file_formatter)
+    file_handler.setFormatter(_formatter(log_format))
     return file_handler
 
 def get_file_handler(log_format: str = LOG_FORMAT, log_prefix: str = "") -> logging.FileHandler:
-    file_formatter = logging.Formatter(log_format)
     file_handler = logging.FileHandler(
-        f"{LOG_DIR_PATH}/{log_prefix}_{datetime.datetime.now().date()}.log",
+        f"{LOG_DIR_PATH}/{log_prefix}_{_TODAY}.log",
         encoding="utf-8"
     )
     file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(file_formatter)
+    file_handler.setFormatter(_formatter(log_format))
     return file_handler
 
 def get_default_stream_handler(log_format : str = LOG_FORMAT) -> logging.StreamHandler:
-    stream_formatter = logging.Formatter(log_format)
     stream_handler = logging.StreamHandler(stream=sys.stdout)
     stream_handler.setLevel(logging.INFO)
-    stream_handler.setFormatter(stream_formatter)
+    stream_handler.setFormatter(_formatter(log_format))
 
     return stream_handler